@@ -2,18 +2,26 @@ import json
 import os
 import io
 import hashlib
+import threading
+import weakref
+from collections import Counter, OrderedDict
 from datetime import date
 import streamlit as st
-from PIL import Image
+from PIL import Image, ImageOps
+
+from xml.sax.saxutils import escape
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import Image as RLImage
 
 from docx import Document
 from docx.shared import Inches, Pt
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
@@ -28,19 +36,32 @@ st.set_page_config(page_title="Trane Chiller Maintenance Report", layout="wide")
 CHECKLIST_PATH = os.path.join("docs", "checklists", "trane_chiller_v1.json")
 FOOTER_TEXT = "Treimax Georgia Maintenance / Service Reporting Tool"
 STATUS_OPTIONS = ["", "OK", "Not OK", "N/A"]
+EMPTY_RESULT = ("", "")  # results[item_id] is a (status, notes) tuple
+EXPORT_FORMATS = {
+    "PDF": ("pdf", "application/pdf"),
+    "Word (DOCX)": ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
 
 # PDF tuning
 PDF_PHOTO_COLS = 2
 PDF_PHOTO_MAX_H = 60 * mm
 PDF_PHOTO_GAP = 4 * mm
 PDF_TOP_GAP_AFTER_TITLE = 6 * mm
+PDF_STATUS_COL_W = 20 * mm
+PDF_NOTES_COL_W = 62 * mm
+
+# Photo tuning (long edge covers a full-width photo at print resolution)
+PHOTO_MAX_PX = 1800
+PHOTO_JPEG_QUALITY = 85
+PHOTO_PASSTHROUGH_BYTES = 500_000  # small RGB JPEGs under this size are embedded as uploaded
+PHOTO_STORE_MAX_BYTES = 128 * 1024 * 1024  # unpinned prepared photos are evicted past this (LRU)
+PHOTO_THUMB_PX = 400  # on-screen previews
+PHOTO_THUMB_QUALITY = 70
 
 # ────────────────────────────────────────────────
 # Helpers
 # ────────────────────────────────────────────────
-def safe_text(x: str) -> str:
-    return (x or "").strip()
-
 def load_checklist(path: str) -> tuple[dict, str]:
     if not os.path.exists(path):
         return {"name": "Checklist missing", "version": "0", "sections": []}, f"Checklist file not found: {path}"
@@ -60,6 +81,15 @@ def normalize_sections(checklist: dict) -> list[dict]:
         out.append({"title": title, "items": items})
     return out
 
+@st.cache_resource(show_spinner=False)
+def load_sections(path: str, mtime: float) -> tuple[list[dict], str]:
+    """
+    Loaded + normalized checklist, shared read-only across reruns. mtime is only part of the cache key,
+    so editing the file invalidates it.
+    """
+    checklist, msg = load_checklist(path)
+    return normalize_sections(checklist), msg
+
 def checklist_signature(sections: list[dict]) -> str:
     """
     Signature of checklist IDs so we can reset session state automatically when checklist changes.
@@ -72,32 +102,22 @@ def checklist_signature(sections: list[dict]) -> str:
     return hashlib.sha1(raw).hexdigest()
 
 def compute_summary(report: dict) -> dict:
-    counts = {"OK": 0, "Not OK": 0, "N/A": 0, "Pending": 0}
-    not_ok_items = []
+    results = report.get("results") or {}
+    statuses = [
+        (it["label"], results.get(it["id"], EMPTY_RESULT)[0])
+        for sec in report["sections"]
+        for it in sec["items"]
+    ]
+    tally = Counter(status for _, status in statuses)
+    counts = {"OK": tally["OK"], "Not OK": tally["Not OK"], "N/A": tally["N/A"]}
+    counts["Pending"] = len(statuses) - sum(counts.values())
+    not_ok_items = [label for label, status in statuses if status == "Not OK"]
     final_status_not_ok = False
 
-    id_to_label = {}
-    for sec in report["sections"]:
-        for it in sec["items"]:
-            id_to_label[it["id"]] = it["label"]
-
-    results = report.get("results") or {}
-    for item_id, label in id_to_label.items():
-        status = (results.get(item_id) or {}).get("status", "")
-        if status == "OK":
-            counts["OK"] += 1
-        elif status == "Not OK":
-            counts["Not OK"] += 1
-            not_ok_items.append(label)
-        elif status == "N/A":
-            counts["N/A"] += 1
-        else:
-            counts["Pending"] += 1
-
-    for item_id, label in id_to_label.items():
-        status = (results.get(item_id) or {}).get("status", "")
+    # Only Not OK items can make the report critical, so there is no need to rescan the checklist.
+    for label in not_ok_items:
         ll = (label or "").lower()
-        if status == "Not OK" and ("return to service" in ll or "final" in ll):
+        if "return to service" in ll or "final" in ll:
             final_status_not_ok = True
             break
 
@@ -112,30 +132,204 @@ def compute_summary(report: dict) -> dict:
     return {"counts": counts, "not_ok_items": not_ok_items, "overall": overall}
 
 def validate_report(report: dict) -> list[str]:
-    errors = []
-    id_to_label = {}
+    # Walk the checklist once; labels come straight from the items instead of an id -> label index.
+    missing, no_notes = [], []
+    results = report.get("results") or {}
     for sec in report["sections"]:
         for it in sec["items"]:
-            id_to_label[it["id"]] = it["label"]
-
+            status, notes = results.get(it["id"], EMPTY_RESULT)
+            if not status:
+                missing.append(f"Select a status for: {it['label']}")
+            elif status == "Not OK" and not notes.strip():
+                no_notes.append(f'Notes required for "Not OK": {it["label"]}')
+    return missing + no_notes
+
+def checklist_rows(report: dict) -> list[tuple[str, list[tuple[str, str, str, str]]]]:
+    """
+    Resolve results against the checklist once: (section title, [(item_id, label, status, notes), ...]).
+    N/A items are left out, as every export and the preview hide them.
+    """
     results = report.get("results") or {}
+    out = []
+    for sec in report["sections"]:
+        rows = []
+        for it in sec["items"]:
+            status, notes = results.get(it["id"], EMPTY_RESULT)
+            if status == "N/A":
+                continue
+            rows.append((it["id"], it["label"], status, notes.strip()))
+        out.append((sec["title"], rows))
+    return out
 
-    for item_id, label in id_to_label.items():
-        status = (results.get(item_id) or {}).get("status", "")
-        if not safe_text(status):
-            errors.append(f"Select a status for: {label}")
-
-    for item_id, v in results.items():
-        status = (v or {}).get("status", "")
-        notes = safe_text((v or {}).get("notes", ""))
-        if status == "Not OK" and not notes:
-            errors.append(f'Notes required for "Not OK": {id_to_label.get(item_id, item_id)}')
-
-    return errors
+def bullet_lines(text: str) -> list[str]:
+    # Non-blank, stripped lines of a free-text box; split once when the report is built.
+    return [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
 
 def _sha1(b: bytes) -> str:
     return hashlib.sha1(b).hexdigest()
 
+def prep_photo(raw: bytes) -> dict:
+    """
+    Downscale and JPEG-encode an uploaded photo once, so exporters can embed the bytes as-is.
+    Also renders a small thumbnail for the on-screen previews.
+    """
+    img = Image.open(io.BytesIO(raw))
+    # Re-encoding a compact RGB JPEG only costs time and quality, but the upload is embedded verbatim, so only
+    # files without EXIF/XMP (camera make, GPS position) qualify. Anything else is re-encoded, which drops the
+    # metadata; an EXIF orientation is applied to the pixels first.
+    keep_raw = (
+        img.format == "JPEG"
+        and img.mode == "RGB"
+        and len(raw) <= PHOTO_PASSTHROUGH_BYTES
+        and max(img.size) <= PHOTO_MAX_PX
+        and not img.info.get("exif")
+        and not img.info.get("xmp")
+    )
+    if img.format == "JPEG" and not keep_raw:
+        # Let libjpeg decode at a reduced DCT scale that still covers PHOTO_MAX_PX. thumbnail()'s own draft
+        # asks for twice the box, which never triggers for a typical 12 MP phone photo.
+        scale = PHOTO_MAX_PX / max(img.size)
+        if scale < 1:
+            img.draft("RGB", (round(img.width * scale), round(img.height * scale)))
+    if not keep_raw:
+        img = ImageOps.exif_transpose(img)  # after draft(): this loads the pixels
+    if img.mode != "RGB":  # phone JPEGs usually are RGB already; skip the full-image copy
+        img = img.convert("RGB")
+    if keep_raw:
+        jpeg = raw
+    else:
+        img.thumbnail((PHOTO_MAX_PX, PHOTO_MAX_PX), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=PHOTO_JPEG_QUALITY, optimize=True, progressive=True, subsampling=2)
+        jpeg = buf.getvalue()
+
+    thumb = img.copy()
+    thumb.thumbnail((PHOTO_THUMB_PX, PHOTO_THUMB_PX), Image.Resampling.LANCZOS)
+    thumb_buf = io.BytesIO()
+    thumb.save(thumb_buf, format="JPEG", quality=PHOTO_THUMB_QUALITY)
+    return {"jpeg": jpeg, "thumb": thumb_buf.getvalue(), "w": img.width, "h": img.height}
+
+class PhotoPins:
+    """
+    Hashes one session's report still references. Kept in session state; the store only holds it weakly.
+    """
+    __slots__ = ("hashes", "__weakref__")
+
+    def __init__(self):
+        self.hashes = set()
+
+class PhotoStore:
+    """
+    Process-wide, content-addressed store of prepared photos (LRU, capped by total bytes).
+    Only entries no live session pins are evicted, so a photo in a report is never dropped; an ended
+    session's PhotoPins is garbage-collected and releases its photos. Shared across session threads, hence the lock.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._pins = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(prepared: dict) -> int:
+        return len(prepared["jpeg"]) + len(prepared["thumb"])
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __getitem__(self, key: str) -> dict:
+        with self._lock:
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def get(self, key: str, pins: PhotoPins) -> dict | None:
+        with self._lock:
+            prepared = self._items.get(key)
+            if prepared is not None:
+                self._items.move_to_end(key)
+                self._pin(pins, key)
+            return prepared
+
+    def put(self, key: str, prepared: dict, pins: PhotoPins) -> None:
+        with self._lock:
+            self._pin(pins, key)
+            if key not in self._items:
+                self._items[key] = prepared
+                self._bytes += self._size(prepared)
+                self._evict()
+
+    def set_pins(self, pins: PhotoPins, hashes) -> None:
+        with self._lock:
+            self._pins.add(pins)
+            pins.hashes = set(hashes)
+            self._evict()
+
+    def _pin(self, pins: PhotoPins, key: str) -> None:
+        self._pins.add(pins)
+        pins.hashes.add(key)
+
+    def _evict(self) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        pinned = set().union(*(p.hashes for p in self._pins))
+        for key in [k for k in self._items if k not in pinned]:  # oldest first
+            if self._bytes <= self.max_bytes:
+                break
+            self._bytes -= self._size(self._items.pop(key))
+
+@st.cache_resource
+def photo_store() -> PhotoStore:
+    return PhotoStore(PHOTO_STORE_MAX_BYTES)
+
+def session_photo_pins() -> PhotoPins:
+    if "photo_pins" not in st.session_state:
+        st.session_state.photo_pins = PhotoPins()
+    return st.session_state.photo_pins
+
+def repin_session_photos() -> None:
+    # Pin exactly what photos_by_item still references, e.g. after a clear or reset.
+    hashes = {p["hash"] for refs in st.session_state.photos_by_item.values() for p in refs}
+    photo_store().set_pins(session_photo_pins(), hashes)
+
+def ingest_photo(raw: bytes, photo_hash: str | None = None) -> dict:
+    # Identical bytes (same session or another one) reuse the stored JPEG; only unseen photos are decoded.
+    photo_hash = photo_hash or _sha1(raw)
+    store = photo_store()
+    pins = session_photo_pins()
+    prepared = store.get(photo_hash, pins)
+    if prepared is None:
+        prepared = prep_photo(raw)
+        store.put(photo_hash, prepared, pins)
+    return {"hash": photo_hash, "w": prepared["w"], "h": prepared["h"]}
+
+def drop_missing_photos() -> int:
+    """
+    Pinned photos are never evicted, so references only dangle if the store itself was recreated
+    (e.g. st.cache_resource.clear()). Drop those references and their per-item hashes so the photos
+    can be uploaded again, instead of exporting a report that silently lacks them.
+    """
+    store = photo_store()
+    dropped = 0
+    for item_id, refs in st.session_state.photos_by_item.items():
+        gone = {p["hash"] for p in refs if p["hash"] not in store}
+        if gone:
+            st.session_state.photos_by_item[item_id] = [p for p in refs if p["hash"] not in gone]
+            st.session_state.get(f"photo_hashes_{item_id}", set()).difference_update(gone)
+            dropped += len(refs) - len(st.session_state.photos_by_item[item_id])
+    if dropped:
+        repin_session_photos()
+        bump_report_version()
+    return dropped
+
+def photo_jpeg(ref: dict) -> bytes:
+    return photo_store()[ref["hash"]]["jpeg"]
+
+def photo_thumb(ref: dict) -> bytes:
+    return photo_store()[ref["hash"]]["thumb"]
+
 def add_photos_dedup(item_id: str, uploaded_files) -> None:
     if uploaded_files is None:
         return
@@ -148,41 +342,129 @@ def add_photos_dedup(item_id: str, uploaded_files) -> None:
         h = _sha1(b)
         if h in known:
             continue
-        st.session_state.photos_by_item[item_id].append(b)
+        st.session_state.photos_by_item[item_id].append(ingest_photo(b, h))
         known.add(h)
+        bump_report_version()
+
+def bump_report_version():
+    """
+    Mark results/photos as changed. They are mutated in place, so current_report is rebuilt off this counter.
+    """
+    st.session_state.report_version = st.session_state.get("report_version", 0) + 1
 
 def reset_report_state():
     st.session_state.results = {}
     st.session_state.photos_by_item = {}
+    repin_session_photos()
     st.session_state.current_report = None
-    # also clear per-item uploader keys/hashes if they exist
+    st.session_state.current_report_sig = None
+    bump_report_version()
+    # also clear uploader/widget keys and per-item photo hashes if they exist
     for k in list(st.session_state.keys()):
-        if k.startswith("uploader_") or k.startswith("notes_") or k.startswith("status_") or k.startswith("photo_hashes_"):
+        if k.startswith("photo_uploader_") or k.startswith("notes_") or k.startswith("status_") or k.startswith("photo_hashes_"):
             del st.session_state[k]
 
 # ────────────────────────────────────────────────
 # PDF Export
 # ────────────────────────────────────────────────
-class PDFWriter:
-    def __init__(self, c: canvas.Canvas, title: str):
-        self.c = c
-        self.title = title
+PDF_STYLES = {
+    "body": ParagraphStyle("body", fontName="Helvetica", fontSize=10, leading=12, spaceAfter=1 * mm),
+    "heading": ParagraphStyle("heading", fontName="Helvetica-Bold", fontSize=12, leading=14, spaceAfter=2 * mm, keepWithNext=1),
+    "section": ParagraphStyle("section", fontName="Helvetica-Bold", fontSize=11, leading=13),
+    "label": ParagraphStyle("label", fontName="Helvetica-Bold", fontSize=9, leading=11, textColor=colors.grey),
+    "value": ParagraphStyle("value", fontName="Helvetica", fontSize=10, leading=12),
+    "small": ParagraphStyle("small", fontName="Helvetica", fontSize=9, leading=10),
+    "summary_title": ParagraphStyle("summary_title", fontName="Helvetica-Bold", fontSize=11, leading=13),
+    "summary_overall": ParagraphStyle("summary_overall", fontName="Helvetica-Bold", fontSize=10, leading=13, alignment=TA_RIGHT),
+    "status": ParagraphStyle("status", fontName="Helvetica-Bold", fontSize=9, leading=12, alignment=TA_CENTER),
+    "cell_notes": ParagraphStyle("cell_notes", fontName="Helvetica", fontSize=9, leading=11, textColor=colors.HexColor("#333333")),
+}
+
+# Status cell backgrounds in the checklist tables; anything else (not yet set) is shown as pending.
+PDF_STATUS_COLORS = {
+    "OK": colors.HexColor("#E6F4EA"),
+    "Not OK": colors.HexColor("#FCE8E6"),
+}
+PDF_PENDING_COLOR = colors.HexColor("#FFF4E0")
+
+# Table styles are fixed, so build them once and share them across every export.
+PDF_TABLE_STYLES = {
+    "section_bar": TableStyle([
+        ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#F2F2F2")),
+        ("LEFTPADDING", (0, 0), (-1, -1), 3 * mm),
+        ("TOPPADDING", (0, 0), (-1, -1), 2 * mm),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2 * mm),
+    ]),
+    "photo_grid": TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4 * mm),
+    ]),
+    "details": TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "BOTTOM"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("TOPPADDING", (0, 0), (-1, -1), 0.5 * mm),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 0.5 * mm),
+    ]),
+    "summary_inner": TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+    ]),
+    "checklist": TableStyle([
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.5, colors.HexColor("#E0E0E0")),
+        ("LEFTPADDING", (0, 0), (-1, -1), 1.5 * mm),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 1.5 * mm),
+        ("TOPPADDING", (0, 0), (-1, -1), 1.2 * mm),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1.2 * mm),
+    ]),
+    "summary": TableStyle([
+        ("SPAN", (0, 1), (1, 1)),
+        ("SPAN", (0, 2), (1, 2)),
+        ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#F7F7F7")),
+        ("BOX", (0, 0), (-1, -1), 1, colors.lightgrey),
+        ("ROUNDEDCORNERS", [3 * mm] * 4),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 3 * mm),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 3 * mm),
+        ("TOPPADDING", (0, 0), (-1, 0), 3 * mm),
+        ("BOTTOMPADDING", (0, -1), (-1, -1), 3 * mm),
+    ]),
+}
+
+def _para(text: str, style: str) -> Paragraph:
+    return Paragraph(escape(text or ""), PDF_STYLES[style])
+
+class PDFWriter(BaseDocTemplate):
+    """
+    A4 document with the grey title bar and footer drawn on every page; content flows through a single frame.
+    """
+
+    def __init__(self, buf, title: str):
+        super().__init__(buf, pagesize=A4, title=title, pageCompression=1)
         self.w, self.h = A4
         self.margin_l = self.margin_r = 16 * mm
         self.margin_t = self.margin_b = 16 * mm
         self.header_h = 14 * mm
         self.footer_h = 10 * mm
-        self.content_top = self.h - self.margin_t - self.header_h
-        self.content_bottom = self.margin_b + self.footer_h + 2 * mm
         self.x0 = self.margin_l
         self.x1 = self.w - self.margin_r
         self.max_w = self.x1 - self.x0
-        self.y = self.content_top
-        self._draw_header()
-        self.y -= PDF_TOP_GAP_AFTER_TITLE
-
-    def _draw_header(self):
-        c = self.c
+        content_top = self.h - self.margin_t - self.header_h - 2 * mm - PDF_TOP_GAP_AFTER_TITLE
+        content_bottom = self.margin_b + self.footer_h + 2 * mm
+        frame = Frame(
+            self.x0, content_bottom, self.max_w, content_top - content_bottom,
+            leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id="content",
+        )
+        self.addPageTemplates([PageTemplate(id="report", frames=[frame], onPage=self._draw_page)])
+
+    def _draw_page(self, c, doc):
         c.saveState()
         bar_y = self.h - self.margin_t - self.header_h
         c.setFillColor(colors.whitesmoke)
@@ -190,121 +472,63 @@ class PDFWriter:
         c.setFillColor(colors.black)
         c.setFont("Helvetica-Bold", 13)
         c.drawString(self.x0 + 4 * mm, bar_y + 4.5 * mm, self.title)
-        c.restoreState()
-        self.y = self.content_top - 2 * mm
 
-    def _draw_footer(self):
-        c = self.c
-        c.saveState()
         c.setFillColor(colors.grey)
         c.setFont("Helvetica", 8)
         c.drawCentredString((self.x0 + self.x1) / 2, self.margin_b + 3.5 * mm, FOOTER_TEXT)
         c.drawRightString(self.x1, self.margin_b + 3.5 * mm, f"Page {c.getPageNumber()}")
         c.restoreState()
 
-    def _new_page(self):
-        self._draw_footer()
-        self.c.showPage()
-        self._draw_header()
-        self.y -= PDF_TOP_GAP_AFTER_TITLE
-
-    def _ensure_space(self, needed_h: float):
-        if self.y - needed_h < self.content_bottom:
-            self._new_page()
-
-    def _text_wrapped(self, txt: str, size=10, bold=False, color=colors.black, leading=12, indent=0):
-        txt = txt or ""
-        c = self.c
-        c.setFont("Helvetica-Bold" if bold else "Helvetica", size)
-        c.setFillColor(color)
-        max_w = self.max_w - indent
-        words = txt.split()
-        if not words:
-            self._ensure_space(leading)
-            self.y -= leading * 0.9
-            return
-
-        line = []
-        while words:
-            line.append(words.pop(0))
-            if words:
-                w = c.stringWidth(" ".join(line + [words[0]]), c._fontname, size)
-                if w > max_w:
-                    self._ensure_space(leading)
-                    c.drawString(self.x0 + indent, self.y, " ".join(line))
-                    self.y -= leading * 0.9
-                    line = []
-        if line:
-            self._ensure_space(leading)
-            c.drawString(self.x0 + indent, self.y, " ".join(line))
-            self.y -= leading * 0.9
-
-    def _section_bar(self, title: str):
-        bar_h = 8 * mm
-        self._ensure_space(bar_h + 4 * mm)
-        y = self.y - bar_h + 2 * mm
-        self.c.setFillColor(colors.HexColor("#F2F2F2"))
-        self.c.rect(self.x0, y, self.max_w, bar_h, stroke=0, fill=1)
-        self.c.setFillColor(colors.black)
-        self.c.setFont("Helvetica-Bold", 11)
-        self.c.drawString(self.x0 + 3 * mm, y + 2.5 * mm, title)
-        self.y = y - 3 * mm
-
-    def _item_line(self, label: str, status: str):
-        status = (status or "").strip() or "—"
-        self._text_wrapped(f"- {label} - {status}", size=10, bold=False, color=colors.black, leading=12, indent=0)
-        self.y -= 1 * mm
-
-    def _photo_grid(self, photos: list[bytes]):
-        if not photos:
-            return
+    def section_bar(self, title: str) -> Table:
+        t = Table([[_para(title, "section")]], colWidths=[self.max_w], spaceAfter=3 * mm)
+        t.keepWithNext = True
+        t.setStyle(PDF_TABLE_STYLES["section_bar"])
+        return t
+
+    def checklist_table(self, rows: list[tuple[str, str, str]]) -> Table:
+        """
+        One table for a run of checklist items (label, status, notes): a single shared style, plus one
+        background command per status cell.
+        """
+        label_w = self.max_w - PDF_STATUS_COL_W - PDF_NOTES_COL_W
+        t = Table(
+            [[_para(label, "value"), _para(status or "—", "status"), _para(notes, "cell_notes")] for label, status, notes in rows],
+            colWidths=[label_w, PDF_STATUS_COL_W, PDF_NOTES_COL_W],
+            hAlign="LEFT",
+            splitInRow=1,  # very long notes may break across pages inside their row
+        )
+        t.setStyle(PDF_TABLE_STYLES["checklist"])
+        t.setStyle(TableStyle([
+            ("BACKGROUND", (1, i), (1, i), PDF_STATUS_COLORS.get(status, PDF_PENDING_COLOR))
+            for i, (_, status, _) in enumerate(rows)
+        ]))
+        return t
+
+    def photo_grid(self, photos: list[dict]) -> Table | None:
         cols = PDF_PHOTO_COLS
         gap = PDF_PHOTO_GAP
         max_h = PDF_PHOTO_MAX_H
         col_w = (self.max_w - (cols - 1) * gap) / cols
 
-        scaled = []
-        for b in photos:
-            img = Image.open(io.BytesIO(b)).convert("RGB")
-            iw, ih = img.size
-            scale = min(col_w / iw, max_h / ih)
-            tw, th = iw * scale, ih * scale
-            scaled.append((b, tw, th))
-
-        i = 0
-        while i < len(scaled):
-            row = scaled[i:i + cols]
-            row_h = max(th for (_, _, th) in row)
-            needed = row_h + 2 * mm
-            if self.y - needed < self.content_bottom:
-                self._new_page()
-
-            top_y = self.y
-            x = self.x0
-            for (b, tw, th) in row:
-                y = top_y - th
-                img = Image.open(io.BytesIO(b)).convert("RGB")
-                img_buf = io.BytesIO()
-                img.save(img_buf, format="JPEG", quality=85)
-                img_buf.seek(0)
-                self.c.drawImage(ImageReader(img_buf), x, y, width=tw, height=th, preserveAspectRatio=True, mask="auto")
-                x += col_w + gap
-
-            self.y = top_y - row_h - 4 * mm
-            i += cols
-
-    def finalize(self):
-        self._draw_footer()
-        self.c.save()
-
-def build_pdf_bytes(report: dict) -> bytes:
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    pdf = PDFWriter(c, title="Trane Chiller Maintenance Report")
-    header = report["header"]
-    summary = compute_summary(report)
-
-    # Details (no "Report Details" heading)
+        cells = []
+        for p in photos:
+            b = photo_jpeg(p)
+            scale = min(col_w / p["w"], max_h / p["h"])
+            cells.append(RLImage(io.BytesIO(b), width=p["w"] * scale, height=p["h"] * scale))
+        if not cells:
+            return None
+
+        rows = []
+        for i in range(0, len(cells), cols):
+            row = cells[i:i + cols]
+            row += [""] * (cols - len(row))
+            rows.append([x for cell in row for x in (cell, "")][:-1])  # gap column between photos
+        col_widths = [w for _ in range(cols) for w in (col_w, gap)][:-1]
+        t = Table(rows, colWidths=col_widths, hAlign="LEFT")
+        t.setStyle(PDF_TABLE_STYLES["photo_grid"])
+        return t
+
+def _pdf_details(pdf: PDFWriter, header: dict) -> Table:
     rows = [
         ("Date", header.get("date", "")),
         ("Project", header.get("project", "")),
@@ -312,126 +536,89 @@ def build_pdf_bytes(report: dict) -> bytes:
         ("Model", header.get("model", "")),
         ("Technician", header.get("technician", "")),
     ]
-    label_w = 28 * mm
-    row_h = 6.5 * mm
-    for k, v in rows:
-        pdf._ensure_space(row_h)
-        c.setFillColor(colors.grey)
-        c.setFont("Helvetica-Bold", 9)
-        c.drawString(pdf.x0, pdf.y, f"{k}:")
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 10)
-        c.drawString(pdf.x0 + label_w, pdf.y, safe_text(v) or "—")
-        pdf.y -= row_h * 0.8
-    pdf.y -= 4 * mm
-
-    # Service Summary (readable Not OK list)
-    box_h = 30 * mm
-    pdf._ensure_space(box_h + 6 * mm)
-    box_y = pdf.y - box_h
-    c.saveState()
-    c.setFillColor(colors.HexColor("#F7F7F7"))
-    c.setStrokeColor(colors.lightgrey)
-    c.setLineWidth(1)
-    c.roundRect(pdf.x0, box_y, pdf.max_w, box_h, radius=3 * mm, stroke=1, fill=1)
-
-    c.setFillColor(colors.black)
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(pdf.x0 + 3 * mm, box_y + box_h - 7 * mm, "Service Summary")
-    c.setFont("Helvetica-Bold", 10)
-    c.drawRightString(pdf.x1 - 3 * mm, box_y + box_h - 7 * mm, f"Overall: {summary['overall']}")
-
-    counts = summary["counts"]
-    c.setFont("Helvetica", 9)
-    c.drawString(
-        pdf.x0 + 3 * mm,
-        box_y + box_h - 14 * mm,
-        f"OK: {counts['OK']} | Not OK: {counts['Not OK']} | N/A: {counts['N/A']} | Pending: {counts['Pending']}",
+    t = Table(
+        [[_para(f"{k}:", "label"), _para(v or "—", "value")] for k, v in rows],
+        colWidths=[28 * mm, pdf.max_w - 28 * mm],
+        hAlign="LEFT",
     )
+    t.setStyle(PDF_TABLE_STYLES["details"])
+    return t
 
-    c.setFillColor(colors.grey)
-    c.setFont("Helvetica-Bold", 9)
-    label_y = box_y + box_h - 21 * mm
-    c.drawString(pdf.x0 + 3 * mm, label_y, "Not OK items:")
-
+def _pdf_summary(pdf: PDFWriter, summary: dict) -> Table:
+    counts = summary["counts"]
     not_ok_items = summary.get("not_ok_items") or []
-    if not not_ok_items:
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 9)
-        c.drawString(pdf.x0 + 28 * mm, label_y, "None")
+    if not_ok_items:
+        not_ok = [_para(f"• {it}", "small") for it in not_ok_items[:6]]
     else:
-        txt = c.beginText()
-        txt.setTextOrigin(pdf.x0 + 28 * mm, label_y)
-        txt.setFont("Helvetica", 9)
-        txt.setLeading(10)
-        max_w = pdf.max_w - 28 * mm - 3 * mm
-
-        def wrap_item(prefix: str, s: str):
-            words = (s or "").split()
-            line = prefix
-            for w in words:
-                test = (line + " " + w).strip()
-                if c.stringWidth(test, "Helvetica", 9) <= max_w:
-                    line = test
-                else:
-                    txt.textLine(line)
-                    line = "  " + w
-            if line.strip():
-                txt.textLine(line)
-
-        for it in not_ok_items[:6]:
-            wrap_item("•", str(it))
-
-        c.setFillColor(colors.black)
-        c.drawText(txt)
+        not_ok = [_para("None", "small")]
+    inner = Table(
+        [[_para("Not OK items:", "label"), not_ok]],
+        colWidths=[25 * mm, pdf.max_w - 31 * mm],
+    )
+    inner.setStyle(PDF_TABLE_STYLES["summary_inner"])
+
+    half_w = pdf.max_w / 2
+    t = Table(
+        [
+            [_para("Service Summary", "summary_title"), _para(f"Overall: {summary['overall']}", "summary_overall")],
+            [_para(f"OK: {counts['OK']} | Not OK: {counts['Not OK']} | N/A: {counts['N/A']} | Pending: {counts['Pending']}", "small"), ""],
+            [inner, ""],
+        ],
+        colWidths=[half_w, half_w],
+    )
+    t.setStyle(PDF_TABLE_STYLES["summary"])
+    return t
 
-    c.restoreState()
-    pdf.y = box_y - 8 * mm
+def build_pdf_bytes(report: dict) -> bytes:
+    buf = io.BytesIO()
+    pdf = PDFWriter(buf, title="Trane Chiller Maintenance Report")
+    header = report["header"]
+    summary = compute_summary(report)
 
-    pdf._text_wrapped("Checklist", size=12, bold=True, leading=14)
-    pdf.y -= 2 * mm
+    # Details (no "Report Details" heading), then the Service Summary box
+    story = [
+        _pdf_details(pdf, header),
+        Spacer(1, 4 * mm),
+        _pdf_summary(pdf, summary),
+        Spacer(1, 8 * mm),
+        _para("Checklist", "heading"),
+    ]
 
-    for sec in report["sections"]:
-        pdf._section_bar(sec["title"])
-        for item in sec["items"]:
-            item_id = item["id"]
-            label = item["label"]
-            status = report["results"].get(item_id, {}).get("status", "") or ""
-            if status == "N/A":
+    photos_by_item = report.get("photos_by_item") or {}
+    for title, rows in checklist_rows(report):
+        story.append(pdf.section_bar(title))
+        # Items are batched into one table per run; an item with photos closes the run so its grid
+        # can follow it (and page-break freely) outside the table.
+        pending = []
+        for item_id, label, status, notes in rows:
+            grid = pdf.photo_grid(photos_by_item.get(item_id, []))
+            if grid is None:
+                pending.append((label, status, notes))
                 continue
-
-            notes = safe_text(report["results"].get(item_id, {}).get("notes", ""))
-            photos = (report.get("photos_by_item") or {}).get(item_id, [])
-
-            pdf._item_line(label, status)
-
-            if notes:
-                pdf._text_wrapped(
-                    f"Notes: {notes}",
-                    size=10,  # same size as checklist lines
-                    color=colors.HexColor("#333333"),
-                    indent=8 * mm,
-                    leading=12,
-                )
-
-            if photos:
-                pdf._photo_grid(photos)
-
-        pdf.y -= 1 * mm
-
-    def write_bullets(title: str, text: str):
-        pdf._section_bar(title)
-        lines = [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+            if pending:
+                story.append(pdf.checklist_table(pending))
+                pending = []
+            item_table = pdf.checklist_table([(label, status, notes)])
+            item_table.keepWithNext = True
+            item_table.spaceAfter = 2 * mm
+            story += [item_table, grid]
+        if pending:
+            story.append(pdf.checklist_table(pending))
+
+        story.append(Spacer(1, 4 * mm))
+
+    def write_bullets(title: str, lines: list[str]):
+        story.append(pdf.section_bar(title))
         if not lines:
-            pdf._text_wrapped("• None", size=10, leading=12)
+            story.append(_para("• None", "body"))
             return
         for ln in lines:
-            pdf._text_wrapped(f"• {ln}", size=10, leading=12)
+            story.append(_para(f"• {ln}", "body"))
 
-    write_bullets("Findings / Issues", report.get("findings", ""))
-    write_bullets("Recommendations / Actions", report.get("recommendations", ""))
+    write_bullets("Findings / Issues", report["findings_lines"])
+    write_bullets("Recommendations / Actions", report["recommendations_lines"])
 
-    pdf.finalize()
+    pdf.build(story)
     return buf.getvalue()
 
 # ────────────────────────────────────────────────
@@ -446,22 +633,37 @@ def _set_cell_shading(cell, fill_hex: str):
     shd.set(qn("w:fill"), fill_hex)
     tcPr.append(shd)
 
+def _add_docx_styles(doc):
+    """
+    Named paragraph styles for the report, so paragraphs and cells reference a style instead of
+    carrying their own bold/size run properties.
+    """
+    for name, size, bold in (
+        ("Report Title", 18, True),
+        ("Report Heading", 12, True),
+        ("Cell Label", None, True),
+        ("Report Footer", 8, False),
+    ):
+        style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = doc.styles["Normal"]
+        style.font.bold = bold
+        if size:
+            style.font.size = Pt(size)
+    doc.styles["Report Footer"].paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
 def build_docx_bytes(report: dict) -> bytes:
     doc = Document()
+    _add_docx_styles(doc)
     section = doc.sections[0]
     footer = section.footer
     p = footer.paragraphs[0] if footer.paragraphs else footer.add_paragraph()
     p.text = FOOTER_TEXT
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    for run in p.runs:
-        run.font.size = Pt(8)
+    p.style = "Report Footer"
 
     header = report["header"]
     summary = compute_summary(report)
 
-    title = doc.add_paragraph("Trane Chiller Maintenance Report")
-    title.runs[0].bold = True
-    title.runs[0].font.size = Pt(18)
+    doc.add_paragraph("Trane Chiller Maintenance Report", style="Report Title")
     doc.add_paragraph()
 
     details = [
@@ -473,76 +675,77 @@ def build_docx_bytes(report: dict) -> bytes:
     ]
     t = doc.add_table(rows=len(details), cols=2)
     t.style = "Table Grid"
-    for i, (k, v) in enumerate(details):
-        t.cell(i, 0).text = f"{k}"
-        t.cell(i, 1).text = f"{v}"
-        t.cell(i, 0).paragraphs[0].runs[0].bold = True
-        _set_cell_shading(t.cell(i, 0), "F2F2F2")
+    # Table.cell() walks the table XML on every call; iterate the rows once instead.
+    for row, (k, v) in zip(t.rows, details):
+        key_cell, value_cell = row.cells
+        key_cell.text = f"{k}"
+        value_cell.text = f"{v}"
+        key_cell.paragraphs[0].style = "Cell Label"
+        _set_cell_shading(key_cell, "F2F2F2")
 
     doc.add_paragraph()
-    sh = doc.add_paragraph("Service Summary")
-    sh.runs[0].bold = True
-    sh.runs[0].font.size = Pt(12)
+    doc.add_paragraph("Service Summary", style="Report Heading")
 
     counts = summary["counts"]
     not_ok_list = summary["not_ok_items"] or ["None"]
-    stbl = doc.add_table(rows=3, cols=2)
+    summary_rows = [
+        ("Overall", summary["overall"]),
+        ("Counts", f"OK: {counts['OK']} | Not OK: {counts['Not OK']} | N/A: {counts['N/A']} | Pending: {counts['Pending']}"),
+        ("Not OK items", ", ".join(not_ok_list)),
+    ]
+    stbl = doc.add_table(rows=len(summary_rows), cols=2)
     stbl.style = "Table Grid"
-    stbl.cell(0, 0).text = "Overall"
-    stbl.cell(0, 1).text = summary["overall"]
-    stbl.cell(1, 0).text = "Counts"
-    stbl.cell(1, 1).text = f"OK: {counts['OK']} | Not OK: {counts['Not OK']} | N/A: {counts['N/A']} | Pending: {counts['Pending']}"
-    stbl.cell(2, 0).text = "Not OK items"
-    stbl.cell(2, 1).text = ", ".join(not_ok_list)
-    for r in range(3):
-        stbl.cell(r, 0).paragraphs[0].runs[0].bold = True
-        _set_cell_shading(stbl.cell(r, 0), "F7F7F7")
+    for row, (k, v) in zip(stbl.rows, summary_rows):
+        key_cell, value_cell = row.cells
+        key_cell.text = k
+        value_cell.text = v
+        key_cell.paragraphs[0].style = "Cell Label"
+        _set_cell_shading(key_cell, "F7F7F7")
 
     doc.add_paragraph()
-    ch = doc.add_paragraph("Checklist")
-    ch.runs[0].bold = True
-    ch.runs[0].font.size = Pt(12)
-
-    for sec in report["sections"]:
-        secp = doc.add_paragraph(sec["title"])
-        secp.runs[0].bold = True
-        secp.runs[0].font.size = Pt(11)
-        for item in sec["items"]:
-            item_id = item["id"]
-            label = item["label"]
-            status = report["results"].get(item_id, {}).get("status", "") or ""
-            if status == "N/A":
-                continue
-            notes = safe_text(report["results"].get(item_id, {}).get("notes", ""))
-            photos = (report.get("photos_by_item") or {}).get(item_id, [])
-            doc.add_paragraph(f"- {label} - {status}")
-            if notes:
-                pn = doc.add_paragraph(f"Notes: {notes}")
-                pn.paragraph_format.left_indent = Inches(0.25)
+    doc.add_paragraph("Checklist", style="Report Heading")
+
+    # One table for the whole checklist: section rows, item rows, and a merged photo row under items that have photos.
+    col_widths = (Inches(3.4), Inches(0.9), Inches(2.2))
+    tbl = doc.add_table(rows=1, cols=3)
+    tbl.style = "Table Grid"
+    for cell, text, width in zip(tbl.rows[0].cells, ("Item", "Status", "Notes"), col_widths):
+        cell.text = text
+        cell.width = width
+        cell.paragraphs[0].style = "Cell Label"
+        _set_cell_shading(cell, "F2F2F2")
+
+    photos_by_item = report.get("photos_by_item") or {}
+    for title, rows in checklist_rows(report):
+        row = tbl.add_row().cells
+        sec_cell = row[0].merge(row[2])
+        sec_cell.text = title
+        sec_cell.paragraphs[0].style = "Cell Label"
+        _set_cell_shading(sec_cell, "F7F7F7")
+        for item_id, label, status, notes in rows:
+            row = tbl.add_row().cells
+            for cell, text, width in zip(row, (label, status, notes), col_widths):
+                cell.text = text
+                cell.width = width
+            photos = [photo_jpeg(p) for p in photos_by_item.get(item_id, [])]
             if photos:
-                for b in photos:
-                    img = Image.open(io.BytesIO(b)).convert("RGB")
-                    img_buf = io.BytesIO()
-                    img.save(img_buf, format="JPEG", quality=85)
-                    img_buf.seek(0)
-                    pic_par = doc.add_paragraph()
-                    pic_par.paragraph_format.left_indent = Inches(0.25)
-                    pic_par.add_run().add_picture(img_buf, width=Inches(4.8))
-        doc.add_paragraph()
-
-    def add_bullets(title: str, text: str):
-        hh = doc.add_paragraph(title)
-        hh.runs[0].bold = True
-        hh.runs[0].font.size = Pt(12)
-        lines = [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+                row = tbl.add_row().cells
+                pic_cell = row[0].merge(row[2])
+                for i, b in enumerate(photos):
+                    pic_par = pic_cell.paragraphs[0] if i == 0 else pic_cell.add_paragraph()
+                    pic_par.add_run().add_picture(io.BytesIO(b), width=Inches(4.8))
+    doc.add_paragraph()
+
+    def add_bullets(title: str, lines: list[str]):
+        doc.add_paragraph(title, style="Report Heading")
         if not lines:
             doc.add_paragraph("• None")
             return
         for ln in lines:
             doc.add_paragraph(f"• {ln}")
 
-    add_bullets("Findings / Issues", report.get("findings", ""))
-    add_bullets("Recommendations / Actions", report.get("recommendations", ""))
+    add_bullets("Findings / Issues", report["findings_lines"])
+    add_bullets("Recommendations / Actions", report["recommendations_lines"])
 
     out = io.BytesIO()
     doc.save(out)
@@ -552,50 +755,70 @@ def build_docx_bytes(report: dict) -> bytes:
 # XLSX Export
 # ────────────────────────────────────────────────
 def build_xlsx_bytes(report: dict) -> bytes:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Report"
+    # Write-only mode streams rows straight into the sheet XML instead of keeping Cell objects.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Report")
     header = report["header"]
-    sections = report["sections"]
-
-    ws.append(["Trane Chiller Maintenance Report"])
-    ws.append([])
-    ws.append(["Date", header.get("date", "")])
-    ws.append(["Project", header.get("project", "")])
-    ws.append(["Serial Number", header.get("serial_number", "")])
-    ws.append(["Model", header.get("model", "")])
-    ws.append(["Technician", header.get("technician", "")])
-    ws.append([])
 
     summary = compute_summary(report)
-    ws.append(["Service Summary"])
-    ws.append(["Overall", summary["overall"]])
     c = summary["counts"]
-    ws.append(["Counts", f"OK: {c['OK']} | Not OK: {c['Not OK']} | N/A: {c['N/A']} | Pending: {c['Pending']}"])
-    ws.append(["Not OK items", ", ".join(summary["not_ok_items"]) or "None"])
-    ws.append([])
+    rows = [
+        ["Trane Chiller Maintenance Report"],
+        [],
+        ["Date", header.get("date", "")],
+        ["Project", header.get("project", "")],
+        ["Serial Number", header.get("serial_number", "")],
+        ["Model", header.get("model", "")],
+        ["Technician", header.get("technician", "")],
+        [],
+        ["Service Summary"],
+        ["Overall", summary["overall"]],
+        ["Counts", f"OK: {c['OK']} | Not OK: {c['Not OK']} | N/A: {c['N/A']} | Pending: {c['Pending']}"],
+        ["Not OK items", ", ".join(summary["not_ok_items"]) or "None"],
+        [],
+        ["Checklist"],
+        ["Section", "Item", "Status", "Notes"],
+    ]
+    rows.extend(
+        (title, label, status, notes)
+        for title, items in checklist_rows(report)
+        for _, label, status, notes in items
+    )
+    rows += [
+        [],
+        ["Findings / Issues", "\n".join(report["findings_lines"]) or "None"],
+        ["Recommendations / Actions", "\n".join(report["recommendations_lines"]) or "None"],
+        [],
+        [FOOTER_TEXT],
+    ]
 
-    ws.append(["Checklist"])
-    ws.append(["Section", "Item", "Status", "Notes"])
-    for sec in sections:
-        for item in sec["items"]:
-            item_id = item["id"]
-            label = item["label"]
-            status = report["results"].get(item_id, {}).get("status", "")
-            if status == "N/A":
-                continue
-            notes = report["results"].get(item_id, {}).get("notes", "")
-            ws.append([sec["title"], label, status, notes])
-
-    ws.append([])
-    ws.append(["Findings / Issues", (report.get("findings") or "").strip() or "None"])
-    ws.append(["Recommendations / Actions", (report.get("recommendations") or "").strip() or "None"])
-    ws.append([])
-    ws.append([FOOTER_TEXT])
+    for row in rows:
+        ws.append(row)
     out = io.BytesIO()
     wb.save(out)
     return out.getvalue()
 
+# ────────────────────────────────────────────────
+# Export cache
+# ────────────────────────────────────────────────
+EXPORTERS = {
+    "pdf": build_pdf_bytes,
+    "docx": build_docx_bytes,
+    "xlsx": build_xlsx_bytes,
+}
+
+def report_cache_key(report: dict) -> str:
+    """
+    Content digest of a report. Photos are referenced by content hash, so the whole dict serialises cheaply.
+    """
+    raw = json.dumps(report, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+@st.cache_data(show_spinner=False, max_entries=6)
+def export_bytes(fmt: str, report_key: str, _report: dict) -> bytes:
+    # _report is excluded from Streamlit's hashing; report_key stands in for it.
+    return EXPORTERS[fmt](_report)
+
 # ────────────────────────────────────────────────
 # UI
 # ────────────────────────────────────────────────
@@ -607,8 +830,8 @@ with st.sidebar:
         reset_report_state()
         st.rerun()
 
-checklist_raw, checklist_msg = load_checklist(CHECKLIST_PATH)
-sections = normalize_sections(checklist_raw)
+checklist_mtime = os.path.getmtime(CHECKLIST_PATH) if os.path.exists(CHECKLIST_PATH) else 0.0
+sections, checklist_msg = load_sections(CHECKLIST_PATH, checklist_mtime)
 
 # Auto-reset state if checklist changed (prevents ID mismatch causing missing OK/Not OK in report)
 sig = checklist_signature(sections)
@@ -629,6 +852,10 @@ if "photos_by_item" not in st.session_state:
     st.session_state.photos_by_item = {}
 if "current_report" not in st.session_state:
     st.session_state.current_report = None
+if "report_version" not in st.session_state:
+    st.session_state.report_version = 0
+if "photo_upload_gen" not in st.session_state:
+    st.session_state.photo_upload_gen = 0
 
 with tab1:
     st.subheader("Report details")
@@ -643,79 +870,115 @@ with tab1:
 
     st.divider()
     st.subheader("Checklist")
+    st.caption("Status and notes are saved when you press “Apply changes”.")
+
+    for sec in sections:
+        for item in sec["items"]:
+            if item["id"] not in st.session_state.results:
+                st.session_state.results[item["id"]] = EMPTY_RESULT
+            if item["id"] not in st.session_state.photos_by_item:
+                st.session_state.photos_by_item[item["id"]] = []
+    if drop_missing_photos():
+        st.warning("Some photos were no longer available on the server and were removed. Please upload them again.")
+
+    # One form for the whole checklist: widget edits only rerun the script on submit.
+    with st.form("checklist_form", clear_on_submit=False):
+        form_values = {}
+        for sec in sections:
+            with st.expander(sec["title"], expanded=True):
+                for item in sec["items"]:
+                    item_id = item["id"]
+                    label = item["label"]
+
+                    current_status, current_notes = st.session_state.results[item_id]
+                    is_na = (current_status == "N/A")
+
+                    label_color = "#999999" if is_na else "#111111"
+                    st.markdown(f"<div style='color:{label_color}; font-weight:600;'>{label}</div>", unsafe_allow_html=True)
+
+                    colA, colB = st.columns([2, 3])
+                    with colA:
+                        status = st.selectbox(
+                            "Status",
+                            options=STATUS_OPTIONS,
+                            index=STATUS_OPTIONS.index(current_status) if current_status in STATUS_OPTIONS else 0,
+                            key=f"status_{item_id}",
+                            label_visibility="collapsed",
+                        )
+                    with colB:
+                        notes_label = "Notes (required for Not OK)" if current_status == "Not OK" else "Notes"
+                        notes = st.text_input(
+                            notes_label,
+                            value=current_notes,
+                            key=f"notes_{item_id}",
+                            placeholder="Describe issue (required if Not OK)" if current_status == "Not OK" else "Optional notes",
+                            disabled=is_na,
+                        )
+                        if current_status == "Not OK" and not current_notes.strip():
+                            st.warning("Notes are required when status is Not OK.", icon="⚠️")
+                        if is_na:
+                            st.caption("Marked N/A — this item will be hidden in the exported report.")
+
+                    form_values[item_id] = (status, notes)
+                    st.divider()
+
+        submitted = st.form_submit_button("Apply changes", type="primary")
+
+    if submitted:
+        results = st.session_state.results
+        changed = {k: v for k, v in form_values.items() if results.get(k) != v}
+        if changed:
+            results.update(changed)
+            bump_report_version()
+            st.rerun()
+
+    st.subheader("Photos")
+    # One uploader for the whole checklist instead of one per item; photos are attached to the picked item.
+    labels = {item["id"]: item["label"] for sec in sections for item in sec["items"]}
+    photo_targets = [item_id for item_id in labels if st.session_state.results[item_id][0] != "N/A"]
+    if photo_targets:
+        colA, colB = st.columns([2, 3])
+        with colA:
+            target = st.selectbox("Attach to item", options=photo_targets, format_func=labels.get, key="photo_target")
+        with colB:
+            uploaded_files = st.file_uploader(
+                "Upload photos (jpg/png)",
+                type=["jpg", "jpeg", "png"],
+                accept_multiple_files=True,
+                key=f"photo_uploader_{st.session_state.photo_upload_gen}",
+            )
+        if uploaded_files:
+            add_photos_dedup(target, uploaded_files)
+            # A new key empties the uploader, so the files are not attached again when another item is picked.
+            st.session_state.photo_upload_gen += 1
+            st.rerun()
+    else:
+        st.caption("Photo upload is disabled: every item is marked N/A.")
 
     for sec in sections:
-        with st.expander(sec["title"], expanded=True):
-            for item in sec["items"]:
-                item_id = item["id"]
-                label = item["label"]
-
-                if item_id not in st.session_state.results:
-                    st.session_state.results[item_id] = {"status": "", "notes": ""}
-                if item_id not in st.session_state.photos_by_item:
-                    st.session_state.photos_by_item[item_id] = []
-
-                current_status = st.session_state.results[item_id]["status"]
-                is_na = (current_status == "N/A")
-
-                label_color = "#999999" if is_na else "#111111"
-                st.markdown(f"<div style='color:{label_color}; font-weight:600;'>{label}</div>", unsafe_allow_html=True)
-
-                colA, colB = st.columns([2, 3])
-                with colA:
-                    status = st.selectbox(
-                        "Status",
-                        options=STATUS_OPTIONS,
-                        index=STATUS_OPTIONS.index(current_status) if current_status in STATUS_OPTIONS else 0,
-                        key=f"status_{item_id}",
-                        label_visibility="collapsed",
-                    )
-                with colB:
-                    notes_label = "Notes (required for Not OK)" if status == "Not OK" else "Notes"
-                    notes = st.text_input(
-                        notes_label,
-                        value=st.session_state.results[item_id]["notes"],
-                        key=f"notes_{item_id}",
-                        placeholder="Describe issue (required if Not OK)" if status == "Not OK" else "Optional notes",
-                        disabled=(status == "N/A"),
-                    )
-                    if status == "Not OK" and not safe_text(notes):
-                        st.warning("Notes are required when status is Not OK.", icon="⚠️")
-                    if status == "N/A":
-                        st.caption("Marked N/A — this item will be hidden in the exported report.")
-
-                st.session_state.results[item_id]["status"] = status
-                st.session_state.results[item_id]["notes"] = notes
-
-                with st.expander("Photos for this item", expanded=False):
-                    if status == "N/A":
-                        st.caption("Photo upload disabled for N/A items.")
-
-                    uploaded_files = st.file_uploader(
-                        "Upload photos (jpg/png)",
-                        type=["jpg", "jpeg", "png"],
-                        accept_multiple_files=True,
-                        key=f"uploader_{item_id}",
-                        disabled=(status == "N/A"),
-                    )
-                    if uploaded_files and status != "N/A":
-                        add_photos_dedup(item_id, uploaded_files)
-
-                    current_photos = st.session_state.photos_by_item[item_id]
-                    if current_photos:
-                        cols = st.columns(3)
-                        for idx, img_bytes in enumerate(current_photos):
-                            with cols[idx % 3]:
-                                st.image(img_bytes, use_container_width=True)
-
-                    if current_photos and st.button("Clear all photos for this item", key=f"clear_{item_id}", disabled=(status == "N/A")):
-                        st.session_state.photos_by_item[item_id] = []
-                        hk = f"photo_hashes_{item_id}"
-                        if hk in st.session_state:
-                            st.session_state[hk] = set()
-                        st.rerun()
-
-                st.divider()
+        items_with_photos = [item for item in sec["items"] if st.session_state.photos_by_item[item["id"]]]
+        if not items_with_photos:
+            continue
+        st.markdown(f"**{sec['title']}**")
+        for item in items_with_photos:
+            item_id = item["id"]
+            current_photos = st.session_state.photos_by_item[item_id]
+            st.caption(f"{item['label']} ({len(current_photos)})")
+
+            cols = st.columns(3)
+            for idx, p in enumerate(current_photos):
+                with cols[idx % 3]:
+                    st.image(photo_thumb(p), use_container_width=True)
+
+            is_na = st.session_state.results[item_id][0] == "N/A"
+            if st.button("Clear all photos for this item", key=f"clear_{item_id}", disabled=is_na):
+                st.session_state.photos_by_item[item_id] = []
+                hk = f"photo_hashes_{item_id}"
+                if hk in st.session_state:
+                    st.session_state[hk] = set()
+                repin_session_photos()
+                bump_report_version()
+                st.rerun()
 
     st.subheader("Findings / Issues")
     findings = st.text_area("Write each point on a new line", height=120, key="findings")
@@ -725,20 +988,28 @@ with tab1:
 
     header = {
         "date": str(report_date),
-        "project": safe_text(project),
-        "serial_number": safe_text(serial_number),
-        "model": safe_text(model),
-        "technician": safe_text(technician),
+        "project": project.strip(),
+        "serial_number": serial_number.strip(),
+        "model": model.strip(),
+        "technician": technician.strip(),
     }
 
-    st.session_state.current_report = {
-        "header": header,
-        "sections": sections,
-        "results": st.session_state.results,
-        "findings": findings,
-        "recommendations": recommendations,
-        "photos_by_item": st.session_state.photos_by_item,
-    }
+    # Rebuild the report (and its export cache key) only when one of its inputs changed.
+    # sig only covers item IDs; the mtime also catches label/title edits that keep the same IDs.
+    report_sig = (tuple(header.items()), sig, checklist_mtime, findings, recommendations, st.session_state.report_version)
+    if st.session_state.get("current_report_sig") != report_sig:
+        st.session_state.current_report = {
+            "header": header,
+            "sections": sections,
+            "results": st.session_state.results,
+            "findings": findings,
+            "recommendations": recommendations,
+            "findings_lines": bullet_lines(findings),
+            "recommendations_lines": bullet_lines(recommendations),
+            "photos_by_item": st.session_state.photos_by_item,
+        }
+        st.session_state.current_report_key = report_cache_key(st.session_state.current_report)
+        st.session_state.current_report_sig = report_sig
 
 with tab2:
     report = st.session_state.get("current_report")
@@ -773,26 +1044,22 @@ with tab2:
     )
     st.divider()
 
-    for sec in report["sections"]:
-        st.markdown(f"### {sec['title']}")
-        for item in sec["items"]:
-            item_id = item["id"]
-            status = report["results"].get(item_id, {}).get("status", "") or "—"
-            if status == "N/A":
-                continue
-            notes = safe_text(report["results"].get(item_id, {}).get("notes", ""))
-            st.write(f"- {item['label']} — **{status}**")
+    photos_by_item = report.get("photos_by_item") or {}
+    for title, rows in checklist_rows(report):
+        st.markdown(f"### {title}")
+        for item_id, label, status, notes in rows:
+            st.write(f"- {label} — **{status or '—'}**")
             if notes:
                 st.caption(f"Notes: {notes}")
-            photos = (report.get("photos_by_item") or {}).get(item_id, [])
+            photos = photos_by_item.get(item_id, [])
             if photos:
                 cols = st.columns(3)
-                for i, b in enumerate(photos):
+                for i, p in enumerate(photos):
                     with cols[i % 3]:
-                        st.image(b, use_container_width=True)
+                        st.image(photo_thumb(p), use_container_width=True)
 
     st.markdown("### Findings / Issues")
-    lines = [ln.strip() for ln in (report.get("findings") or "").splitlines() if ln.strip()]
+    lines = report["findings_lines"]
     if not lines:
         st.write("• None")
     else:
@@ -800,7 +1067,7 @@ with tab2:
             st.write(f"• {ln}")
 
     st.markdown("### Recommendations / Actions")
-    lines = [ln.strip() for ln in (report.get("recommendations") or "").splitlines() if ln.strip()]
+    lines = report["recommendations_lines"]
     if not lines:
         st.write("• None")
     else:
@@ -813,16 +1080,18 @@ with tab2:
     disabled = bool(errors)
 
     if disabled:
-        st.info("Export buttons are disabled until all validation issues are fixed.")
-
-    pdf_bytes = build_pdf_bytes(report)
-    docx_bytes = build_docx_bytes(report)
-    xlsx_bytes = build_xlsx_bytes(report)
+        st.info("Export is disabled until all validation issues are fixed.")
 
-    c1, c2, c3 = st.columns(3)
+    c1, c2 = st.columns([2, 3])
     with c1:
-        st.download_button("Download PDF", data=pdf_bytes, file_name=f"{file_base}.pdf", mime="application/pdf", disabled=disabled)
+        fmt_label = st.radio("Format", options=list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    fmt, mime = EXPORT_FORMATS[fmt_label]
+    # Both tabs run on every rerun, so the file is only built once the user asks for it.
+    # Any report edit changes the key and brings the Prepare button back.
+    export_id = (fmt, st.session_state.current_report_key)
     with c2:
-        st.download_button("Download Word (DOCX)", data=docx_bytes, file_name=f"{file_base}.docx", mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document", disabled=disabled)
-    with c3:
-        st.download_button("Download Excel", data=xlsx_bytes, file_name=f"{file_base}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", disabled=disabled)
+        if st.button(f"Prepare {fmt_label}", key="prepare_export", disabled=disabled):
+            st.session_state.prepared_export = export_id
+        if not disabled and st.session_state.get("prepared_export") == export_id:
+            data = export_bytes(fmt, st.session_state.current_report_key, report)
+            st.download_button(f"Download {fmt_label}", data=data, file_name=f"{file_base}.{fmt}", mime=mime)